@@ -1,17 +1,41 @@
 #!/usr/bin/env python3
 import asyncio
 import argparse
+import functools
+import json
 import os
+import re
 import sys
 import shlex
 import textwrap
+import threading
+from collections import OrderedDict
 from typing import Optional
 
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as FastHTMLParser
+except ImportError:
+    try:
+        # Older selectolax builds only ship the Modest backend (same API)
+        from selectolax.parser import HTMLParser as FastHTMLParser
+    except ImportError:
+        # Optional fast path; fall back to BeautifulSoup when selectolax is missing
+        FastHTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+# Only the <body> subtree carries visible text; skip building the rest
+BODY_STRAINER = SoupStrainer("body")
 
 try:
     from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
@@ -21,7 +45,176 @@ except Exception as e:
 
 console = Console(force_terminal=True, soft_wrap=True)
 
-
+# Resource types blocked by default; none of them affect the DOM we render.
+# Stylesheets are kept because visibility (waitfor, text mode) depends on them.
+DEFAULT_BLOCKED_RESOURCES = ("image", "media", "font")
+
+# --allow-resources name -> CDP Fetch resource type. Blocking goes through the
+# Fetch domain rather than page.route(): routing turns off the HTTP cache and
+# sends every request through a Python handler, Fetch only pauses these types.
+BLOCKABLE_RESOURCES = {
+    "image": "Image",
+    "media": "Media",
+    "font": "Font",
+}
+
+# Max number of Locator objects kept by ConsoleBrowser._get_locator
+LOCATOR_CACHE_SIZE = 128
+
+# One shell-like word: unquoted runs and '...' / "..." segments glued together
+_TOKEN_RE = re.compile(r"""(?:[^\s"']|"[^"]*"|'[^']*')+""")
+_QUOTED_RE = re.compile(r""""([^"]*)"|'([^']*)'""")
+
+# Whitespace around line breaks, including whole blank lines
+_BLANK_LINES_RE = re.compile(r"\s*\n\s*")
+
+
+USAGE = textwrap.dedent(
+    """
+    Commands:
+      - goto <url>                : navigate to a URL
+      - back                      : go back in history
+      - forward                   : go forward in history
+      - reload                    : reload current page
+      - click <selector> [nth]    : click element by CSS or XPath (prefix with // for XPath). Optional nth index (0-based)
+      - type <selector> <text> [--slow]: type text into an input/textarea element (--slow sends real key events)
+      - fill <selector> <text>    : fill value directly into an input/textarea
+      - select <selector> <value> : select an option value in a <select>
+      - press <key>               : press a key on the page (e.g., Enter)
+      - press <selector> <key>    : press a key on an element (e.g., input then Enter)
+      - waitfor <selector> [state|timeout_ms] [timeout_ms]: wait for selector state (attached|detached|visible|hidden) or specify a timeout directly
+      - list <selector> [limit]   : list matching elements with indices and brief info
+      - eval <js>                 : evaluate JavaScript in the page context
+      - view [html|text]          : switch render mode (html default or simplified text)
+      - wait <ms>                 : wait for milliseconds
+      - title                     : print document.title
+      - url                       : print current URL
+      - frames                    : list frames and current selection
+      - useframe <idx|name=|url=>: switch to a frame by index, exact name, or url substring
+      - usemainframe              : switch to main page context
+      - help                      : show this help
+      - exit                      : quit
+
+    Selector notes:
+      - CSS examples: a#login, button.submit, input[name="q"]
+      - XPath examples: //a[contains(., 'Next')], (//button)[1]
+    """
+).strip()
+
+
+# Page helpers below are installed once per document via add_init_script and
+# invoked by name, so V8 compiles them once instead of on every command
+HIGHLIGHT_JS = r"""
+    (arg) => {
+        const sel = arg.sel;
+        const nth = arg.nth;
+        let elements = [];
+        if (sel.startsWith('xpath=')) {
+            const xpath = sel.slice(6);
+            const itr = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_ITERATOR_TYPE, null);
+            let el; while ((el = itr.iterateNext())) { elements.push(el); }
+        } else {
+            elements = Array.from(document.querySelectorAll(sel));
+        }
+        if (elements.length === 0) return 0;
+        const setMark = (el) => {
+            try { el.setAttribute('data-console-clicked', 'true'); } catch(e) {}
+            try { el.style && (el.style.outline = '2px dashed red'); } catch(e) {}
+        };
+        if (typeof nth === 'number') {
+            const el = elements[nth]; if (el) setMark(el);
+            return el ? 1 : 0;
+        } else {
+            elements.forEach(setMark);
+            return elements.length;
+        }
+    }
+"""
+
+
+LIST_JS = r"""
+    (arg) => {
+        const sel = arg.sel;
+        const lim = arg.lim;
+        let elements = [];
+        if (sel.startsWith('xpath=')) {
+            const xpath = sel.slice(6);
+            const itr = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_ITERATOR_TYPE, null);
+            let el; while ((el = itr.iterateNext())) { elements.push(el); }
+        } else {
+            elements = Array.from(document.querySelectorAll(sel));
+        }
+        const items = elements.slice(0, lim).map((el, idx) => {
+            const name = el.tagName.toLowerCase();
+            const id = el.id || '';
+            const cls = (el.className && typeof el.className === 'string') ? el.className : '';
+            const text = (el.textContent || '').trim().replace(/\s+/g, ' ').slice(0, 160);
+            const href = el.getAttribute && el.getAttribute('href');
+            const nameAttr = el.getAttribute && el.getAttribute('name');
+            const typeAttr = el.getAttribute && el.getAttribute('type');
+            return { idx, name, id, cls, text, href, nameAttr, typeAttr };
+        });
+        return { total: elements.length, items };
+    }
+"""
+
+
+# Evaluates REPL expressions from a string so each eval ships only the source.
+# Compiling and running are separate steps: if CSP blocks eval() the helper
+# returns the EVAL_UNAVAILABLE marker before any user code has run.
+EVAL_JS = r"""
+    async (src) => {
+        let fn;
+        try {
+            fn = (0, eval)('(async () => (' + src + '))');
+        } catch (e) {
+            if (e instanceof EvalError) return { __consoleEvalUnavailable: true };
+            return 'Error: ' + e.message;
+        }
+        try {
+            return await fn();
+        } catch (e) {
+            return 'Error: ' + e.message;
+        }
+    }
+"""
+
+
+# Produces the render body in-page: innerText with blank lines collapsed (the
+# same transform as _strip_blank_lines) or the serialized document, clipped.
+SNAPSHOT_JS = r"""
+    (arg) => {
+        let s;
+        if (arg.mode === 'text') {
+            s = document.body ? document.body.innerText : '';
+            s = s.replace(/\s*\n\s*/g, '\n').trim();
+        } else {
+            s = document.doctype ? new XMLSerializer().serializeToString(document.doctype) : '';
+            if (document.documentElement) s += document.documentElement.outerHTML;
+        }
+        // Report length in code points, as Python's len() counts them
+        const pairs = (s.match(/[\uD800-\uDBFF][\uDC00-\uDFFF]/g) || []).length;
+        const total = s.length - pairs;
+        if (total <= arg.max) return { total, head: s };
+        // slice() counts UTF-16 units; don't cut a surrogate pair in half
+        let end = arg.max;
+        const last = s.charCodeAt(end - 1);
+        if (last >= 0xD800 && last <= 0xDBFF) end -= 1;
+        return { total, head: s.slice(0, end) };
+    }
+"""
+
+
+@functools.lru_cache(maxsize=512)
+def _normalize_selector(selector: str) -> str:
+    # Allow plain CSS or XPath-like via prefix
+    sel = selector.strip()
+    if sel.startswith("//") or sel.startswith("./"):
+        sel = f"xpath={sel}"
+    return sel
+
+
+@functools.lru_cache(maxsize=64)
 def normalize_url(url: str) -> str:
     if not url:
         return url
@@ -32,41 +225,71 @@ def normalize_url(url: str) -> str:
 
 
 class ConsoleBrowser:
-    def __init__(self, user_data_dir: Optional[str] = None, headless: bool = True, render_mode: str = "html", max_chars: int = 200000):
+    def __init__(self, user_data_dir: Optional[str] = None, headless: bool = True, render_mode: str = "html", max_chars: int = 200000, keystroke: bool = False, no_images: bool = False, allow_resources: Optional[list] = None, quiet_ms: int = 300, settle_cap_ms: int = 1500):
         self.user_data_dir = user_data_dir
         self.headless = headless
         self.render_mode = render_mode  # 'html' | 'text'
         self.max_chars = max_chars
+        self.keystroke = keystroke  # send real key events in `type` instead of fill()
+        self.no_images = no_images  # skip loading/decoding images and media
+        self.blocked_resources = set(DEFAULT_BLOCKED_RESOURCES) - set(allow_resources or [])
+        if no_images:
+            self.blocked_resources |= {"image", "media"}
+        self.quiet_ms = quiet_ms  # network quiet window that counts as settled
+        self.settle_cap_ms = settle_cap_ms  # upper bound on the quiet-network wait
+        self._inflight = {}  # Request -> main-frame navigation count when it started
+        self._nav_count = 0  # main-frame navigations seen so far
         self._playwright = None
         self._browser = None
         self._context = None
         self.page = None
         self._last_highlight_selector = None
+        self._last_highlight_key = None  # (target, sel, nth, url) already marked
         self._current_frame = None  # type: ignore
+        self._target_ref = None  # current frame, else page; kept in sync by start/use_frame
+        self._render_cache = None  # (key, text) of the last fallback parse
+        self._locator_cache = OrderedDict()  # (target, selector) -> Locator
 
     def _target(self):
-        return self._current_frame if self._current_frame is not None else self.page
+        return self._target_ref
 
-    def _locator(self, sel: str):
+    def _get_locator(self, selector: str):
+        # LRU of Locators per (frame, raw selector); cleared on navigation/detach.
+        # Keyed on the frame object itself: an id() could be reused by a new frame.
         target = self._target()
-        return target.locator(sel)
+        key = (target, selector)
+        locator = self._locator_cache.get(key)
+        if locator is not None:
+            self._locator_cache.move_to_end(key)
+            return locator
+        locator = target.locator(_normalize_selector(selector))
+        self._locator_cache[key] = locator
+        if len(self._locator_cache) > LOCATOR_CACHE_SIZE:
+            self._locator_cache.popitem(last=False)
+        return locator
 
     async def start(self):
         self._playwright = await async_playwright().start()
         # Use persistent context to preserve cookies/localstorage within sessions
         user_data_dir = self.user_data_dir or os.path.join(os.getcwd(), ".console_browser_userdata")
         os.makedirs(user_data_dir, exist_ok=True)
+        # Nothing is painted for the terminal, so skip GPU and background work
+        launch_args = ["--disable-gpu", "--disable-dev-shm-usage", "--disable-background-networking"]
+        if self.no_images:
+            launch_args.append("--blink-settings=imagesEnabled=false")
         self._context = await self._playwright.chromium.launch_persistent_context(
             user_data_dir=user_data_dir,
             headless=self.headless,
             viewport={"width": 1280, "height": 800},
             accept_downloads=False,
+            args=launch_args,
         )
         # Use single page
         if len(self._context.pages) > 0:
             self.page = self._context.pages[0]
         else:
             self.page = await self._context.new_page()
+        self._target_ref = self.page
 
         # Pipe page console messages to our console
         def _on_console_message(msg):
@@ -77,10 +300,88 @@ class ConsoleBrowser:
                 msg_text = getattr(msg, "text", None)
                 if callable(msg_text):
                     msg_text = msg_text()
-                console.print(Text(f"[page:console] {msg_type} - {msg_text}", style="dim"))
+                if msg_text and "net::ERR_BLOCKED_BY_CLIENT" in msg_text:
+                    # Requests we blocked ourselves in _block_resources
+                    return
+                # Hot path on chatty pages: plain string, no Text object or markup parsing
+                console.print(f"[page:console] {msg_type} - {msg_text}", style="dim", markup=False, highlight=False)
             except Exception:
                 pass
         self.page.on("console", _on_console_message)
+        self.page.on("framenavigated", self._on_frame_navigated)
+        self.page.on("framedetached", self._on_frame_detached)
+
+        # Track in-flight requests for wait_settled's quiet-network check
+        def _on_request(req):
+            self._inflight[req] = self._nav_count
+
+        def _on_request_done(req):
+            self._inflight.pop(req, None)
+        self.page.on("request", _on_request)
+        self.page.on("requestfinished", _on_request_done)
+        self.page.on("requestfailed", _on_request_done)
+        self.page.on("domcontentloaded", self._on_document_loaded)
+        await self.page.add_init_script(f"window.__consoleHighlight = {HIGHLIGHT_JS};")
+        await self.page.add_init_script(f"window.__consoleList = {LIST_JS};")
+        await self.page.add_init_script(f"window.__consoleEval = {EVAL_JS};")
+
+        if self.blocked_resources:
+            await self._block_resources()
+
+    async def _block_resources(self):
+        # Heavy resources delay the quiet-network settle. Only requests of the
+        # blocked types are paused, and each is failed straight away; everything
+        # else is never intercepted. Applies to this page's target (out-of-process
+        # iframes are not covered).
+        patterns = [
+            {"resourceType": BLOCKABLE_RESOURCES[rtype]}
+            for rtype in sorted(self.blocked_resources)
+            if rtype in BLOCKABLE_RESOURCES
+        ]
+        if not patterns:
+            return
+        cdp = await self._context.new_cdp_session(self.page)
+
+        async def _fail(request_id):
+            try:
+                await cdp.send("Fetch.failRequest", {"requestId": request_id, "errorReason": "BlockedByClient"})
+            except Exception:
+                # Request already gone (page navigated or closed)
+                pass
+
+        def _on_request_paused(params):
+            asyncio.ensure_future(_fail(params["requestId"]))
+        cdp.on("Fetch.requestPaused", _on_request_paused)
+        await cdp.send("Fetch.enable", {"patterns": patterns})
+
+    def _on_frame_navigated(self, frame):
+        # New documents invalidate cached locators and highlight marks
+        self._locator_cache.clear()
+        self._last_highlight_key = None
+        if frame is self.page.main_frame:
+            self._nav_count += 1
+
+    def _on_document_loaded(self, _page):
+        # A new main document is up: requests from before its navigation (unload
+        # beacons, the old page's stragglers) may never report finished/failed,
+        # so stop waiting on them. Same-document navigations don't fire this.
+        for req in [r for r, nav in self._inflight.items() if nav < self._nav_count]:
+            del self._inflight[req]
+
+    def _on_frame_detached(self, frame):
+        # Drop cached locators and highlight state for a frame that no longer exists
+        for key in [k for k in self._locator_cache if k[0] is frame]:
+            del self._locator_cache[key]
+        if self._last_highlight_key is not None and self._last_highlight_key[0] is frame:
+            self._last_highlight_key = None
+        # ...and its requests, which can be cut off without a requestfailed
+        for req in list(self._inflight):
+            try:
+                if req.frame is frame:
+                    del self._inflight[req]
+            except Exception:
+                # Service worker requests have no frame
+                pass
 
     async def close(self):
         try:
@@ -92,15 +393,31 @@ class ConsoleBrowser:
 
     async def wait_settled(self, timeout_ms: int = 6000):
         try:
-            await self.page.wait_for_load_state("load", timeout=timeout_ms)
+            await self.page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
         except PlaywrightTimeoutError:
             pass
+        # networkidle never fires on pages with polling/ads; instead wait for a
+        # short window with no in-flight requests, bounded by a hard cap
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.settle_cap_ms / 1000.0
+        quiet_since = None
+        while loop.time() < deadline:
+            now = loop.time()
+            if self._inflight:
+                quiet_since = None
+            elif quiet_since is None:
+                quiet_since = now
+            elif now - quiet_since >= self.quiet_ms / 1000.0:
+                break
+            await asyncio.sleep(0.05)
+
+    async def wait_loaded(self, timeout_ms: int = 500):
+        # Lighter than wait_settled for value edits: returns at once when the
+        # document is already loaded instead of watching the network
         try:
-            await self.page.wait_for_load_state("networkidle", timeout=timeout_ms)
+            await self.page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
         except PlaywrightTimeoutError:
             pass
-        # Small extra delay for SPA DOM updates
-        await asyncio.sleep(0.2)
 
     async def goto(self, url: str):
         url = normalize_url(url)
@@ -138,32 +455,32 @@ class ConsoleBrowser:
             console.print(Panel.fit(f"Failed to go forward: {e}", title="error", border_style="red"))
 
     async def click(self, selector: str, nth: Optional[int] = None):
-        # Allow plain CSS or XPath-like via prefix
-        sel = selector.strip()
-        if sel.startswith("//") or sel.startswith("./"):
-            sel = f"xpath={sel}"
+        sel = _normalize_selector(selector)
         # Highlight before click (for same-page)
         self._last_highlight_selector = sel
         try:
             await self._highlight(sel, nth)
         except Exception:
             pass
-        # Try click with optional navigation expectation
+        # Click once and watch for a main-frame navigation it may trigger
         try:
-            navigation_happened = False
+            locator = self._get_locator(selector)
+            locator = locator.nth(nth) if nth is not None else locator.first
+            main_frame = self.page.main_frame
+            nav_task = asyncio.ensure_future(
+                self.page.wait_for_event("framenavigated", predicate=lambda fr: fr == main_frame, timeout=3000)
+            )
             try:
-                async with self.page.expect_navigation(wait_until="load", timeout=3000):
-                    if nth is not None:
-                        await self._locator(sel).nth(nth).click()
-                    else:
-                        await self._locator(sel).first.click()
+                await locator.click()
+            except Exception:
+                nav_task.cancel()
+                raise
+            try:
+                await nav_task
                 navigation_happened = True
             except PlaywrightTimeoutError:
-                # No navigation; still perform click
-                if nth is not None:
-                    await self._locator(sel).nth(nth).click()
-                else:
-                    await self._locator(sel).first.click()
+                # SPA-style click without navigation
+                navigation_happened = False
             await self.wait_settled()
             action = f"click {selector}" if nth is None else f"click {selector} {nth}"
             note = "(navigated)" if navigation_happened else ""
@@ -171,21 +488,26 @@ class ConsoleBrowser:
         except Exception as e:
             console.print(Panel.fit(f"Failed to click {selector}: {e}", title="error", border_style="red"))
 
-    async def type_into(self, selector: str, text: str, clear: bool = True):
-        sel = selector.strip()
-        if sel.startswith("//") or sel.startswith("./"):
-            sel = f"xpath={sel}"
+    async def type_into(self, selector: str, text: str, clear: bool = True, per_char_delay: Optional[int] = None):
+        if per_char_delay is None and self.keystroke:
+            per_char_delay = 20
         try:
-            locator = self._locator(sel)
+            locator = self._get_locator(selector)
             await locator.first.wait_for(state="visible", timeout=5000)
             await locator.first.focus()
-            if clear:
-                try:
-                    await locator.first.fill("")
-                except Exception:
-                    pass
-            await locator.first.type(text, delay=20)
-            await self.wait_settled()
+            if per_char_delay is not None:
+                if clear:
+                    try:
+                        await locator.first.fill("")
+                    except Exception:
+                        pass
+                await locator.first.type(text, delay=per_char_delay)
+            elif clear:
+                # fill() replaces the value in a single call
+                await locator.first.fill(text)
+            else:
+                await locator.first.fill(await locator.first.input_value() + text)
+            await self.wait_loaded()
             console.print(Panel.fit(f"typed into {selector}: {text}", title="type", border_style="green"))
         except Exception as e:
             console.print(Panel.fit(f"Failed to type into {selector}: {e}", title="error", border_style="red"))
@@ -193,7 +515,15 @@ class ConsoleBrowser:
     async def eval_js(self, expression: str):
         try:
             target = self._target()
-            result = await target.evaluate(f"() => (async () => {{ try {{ return await ( {expression} ); }} catch(e) {{ return 'Error: ' + e.message; }} }})()")
+            result = await target.evaluate(
+                "(s) => window.__consoleEval ? window.__consoleEval(s) : { __consoleEvalUnavailable: true }",
+                expression,
+            )
+            if isinstance(result, dict) and result.get("__consoleEvalUnavailable"):
+                # Helper missing in this document or eval() blocked by CSP; the
+                # expression hasn't run yet, so it's safe to send it inline.
+                # (Not a null check like _highlight: null is a valid eval result.)
+                result = await target.evaluate(f"() => (async () => {{ try {{ return await ( {expression} ); }} catch(e) {{ return 'Error: ' + e.message; }} }})()")
             console.print(Panel.fit(f"{result}", title="eval", border_style="green"))
         except Exception as e:
             console.print(Panel.fit(f"Failed to eval JS: {e}", title="error", border_style="red"))
@@ -201,10 +531,7 @@ class ConsoleBrowser:
     async def press(self, key: str, selector: Optional[str] = None):
         try:
             if selector:
-                sel = selector.strip()
-                if sel.startswith("//") or sel.startswith("./"):
-                    sel = f"xpath={sel}"
-                locator = self._locator(sel).first
+                locator = self._get_locator(selector).first
                 await locator.wait_for(state="visible", timeout=5000)
                 await locator.press(key)
             else:
@@ -216,73 +543,42 @@ class ConsoleBrowser:
             console.print(Panel.fit(f"Failed to press {key}: {e}", title="error", border_style="red"))
 
     async def waitfor(self, selector: str, state: str = "visible", timeout_ms: int = 10000):
-        sel = selector.strip()
-        if sel.startswith("//") or sel.startswith("./"):
-            sel = f"xpath={sel}"
         try:
-            await self._locator(sel).first.wait_for(state=state, timeout=timeout_ms)
+            await self._get_locator(selector).first.wait_for(state=state, timeout=timeout_ms)
             console.print(Panel.fit(f"waited for {selector} state={state}", title="waitfor", border_style="green"))
         except Exception as e:
             console.print(Panel.fit(f"Failed to wait for {selector}: {e}", title="error", border_style="red"))
 
     async def fill(self, selector: str, text: str):
-        sel = selector.strip()
-        if sel.startswith("//") or sel.startswith("./"):
-            sel = f"xpath={sel}"
         try:
-            locator = self._locator(sel).first
+            locator = self._get_locator(selector).first
             await locator.wait_for(state="visible", timeout=5000)
             await locator.fill(text)
-            await self.wait_settled()
+            await self.wait_loaded()
             console.print(Panel.fit(f"filled {selector}: {text}", title="fill", border_style="green"))
         except Exception as e:
             console.print(Panel.fit(f"Failed to fill {selector}: {e}", title="error", border_style="red"))
 
     async def select(self, selector: str, value: str):
-        sel = selector.strip()
-        if sel.startswith("//") or sel.startswith("./"):
-            sel = f"xpath={sel}"
         try:
-            locator = self._locator(sel).first
+            locator = self._get_locator(selector).first
             await locator.wait_for(state="visible", timeout=5000)
             await locator.select_option(value=value)
+            # onchange may navigate (jump menus, language pickers); wait it out
             await self.wait_settled()
             console.print(Panel.fit(f"selected {value} on {selector}", title="select", border_style="green"))
         except Exception as e:
             console.print(Panel.fit(f"Failed to select on {selector}: {e}", title="error", border_style="red"))
 
     async def list_elements(self, selector: str, limit: int = 20):
-        sel = selector.strip()
-        if sel.startswith("//") or sel.startswith("./"):
-            sel = f"xpath={sel}"
-        script = r"""
-            (arg) => {
-                const sel = arg.sel;
-                const lim = arg.lim;
-                let elements = [];
-                if (sel.startsWith('xpath=')) {
-                    const xpath = sel.slice(6);
-                    const itr = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_ITERATOR_TYPE, null);
-                    let el; while ((el = itr.iterateNext())) { elements.push(el); }
-                } else {
-                    elements = Array.from(document.querySelectorAll(sel));
-                }
-                const items = elements.slice(0, lim).map((el, idx) => {
-                    const name = el.tagName.toLowerCase();
-                    const id = el.id || '';
-                    const cls = (el.className && typeof el.className === 'string') ? el.className : '';
-                    const text = (el.textContent || '').trim().replace(/\s+/g, ' ').slice(0, 160);
-                    const href = el.getAttribute && el.getAttribute('href');
-                    const nameAttr = el.getAttribute && el.getAttribute('name');
-                    const typeAttr = el.getAttribute && el.getAttribute('type');
-                    return { idx, name, id, cls, text, href, nameAttr, typeAttr };
-                });
-                return { total: elements.length, items };
-            }
-        """
+        sel = _normalize_selector(selector)
         try:
             target = self._target()
-            data = await target.evaluate(script, {"sel": sel, "lim": limit})
+            arg = {"sel": sel, "lim": limit}
+            data = await target.evaluate("(arg) => window.__consoleList ? window.__consoleList(arg) : null", arg)
+            if data is None:
+                # Document predates the init script (e.g. the initial about:blank)
+                data = await target.evaluate(LIST_JS, arg)
             header = f"Found {data['total']} elements for selector: {selector} (showing up to {limit})"
             console.print(Panel.fit(header, title="list", border_style="blue"))
             for item in data["items"]:
@@ -305,12 +601,11 @@ class ConsoleBrowser:
 
     async def list_frames(self):
         frames = self.page.frames
-        lines = []
-        for idx, fr in enumerate(frames):
-            name = fr.name or ""
-            url = fr.url
-            marker = "*" if (self._current_frame is not None and fr == self._current_frame) else " "
-            lines.append(f"{marker}[{idx}] name='{name}' url='{url}'")
+        current = self._current_frame
+        lines = [
+            f"{'*' if fr is current else ' '}[{idx}] name='{fr.name or ''}' url='{fr.url}'"
+            for idx, fr in enumerate(frames)
+        ]
         if not lines:
             console.print(Panel.fit("No frames", title="frames", border_style="blue"))
         else:
@@ -353,105 +648,155 @@ class ConsoleBrowser:
             console.print(Panel.fit(f"Frame not found for token: {token}", title="useframe", border_style="red"))
             return
         self._current_frame = chosen
+        self._target_ref = chosen
         console.print(Panel.fit(f"Using frame: name='{chosen.name}' url='{chosen.url}'", title="useframe", border_style="green"))
 
     async def use_main_frame(self):
         self._current_frame = None
+        self._target_ref = self.page
         console.print(Panel.fit("Using main frame", title="useframe", border_style="green"))
 
     async def _highlight(self, sel: str, nth: Optional[int]):
         # Mark the element(s) with data-clicked for later rendering visibility
-        script = r"""
-            (arg) => {
-                const sel = arg.sel;
-                const nth = arg.nth;
-                let elements = [];
-                if (sel.startsWith('xpath=')) {
-                    const xpath = sel.slice(6);
-                    const itr = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_ITERATOR_TYPE, null);
-                    let el; while ((el = itr.iterateNext())) { elements.push(el); }
-                } else {
-                    elements = Array.from(document.querySelectorAll(sel));
-                }
-                if (elements.length === 0) return 0;
-                const setMark = (el) => {
-                    try { el.setAttribute('data-console-clicked', 'true'); } catch(e) {}
-                    try { el.style && (el.style.outline = '2px dashed red'); } catch(e) {}
-                };
-                if (typeof nth === 'number') {
-                    const el = elements[nth]; if (el) setMark(el);
-                    return el ? 1 : 0;
-                } else {
-                    elements.forEach(setMark);
-                    return elements.length;
-                }
-            }
-        """
+        target = self._target()
+        # The frame object itself, not id(): ids can be reused after a detach
+        key = (target, sel, nth, self.page.url)
+        if key == self._last_highlight_key:
+            # Same element(s) on the same document are still marked
+            return
         try:
-            target = self._target()
-            await target.evaluate(script, {"sel": sel, "nth": nth})
+            marked = await target.evaluate(
+                "(arg) => window.__consoleHighlight ? window.__consoleHighlight(arg) : null",
+                {"sel": sel, "nth": nth},
+            )
+            if marked is None:
+                # Document predates the init script (e.g. the initial about:blank)
+                marked = await target.evaluate(HIGHLIGHT_JS, {"sel": sel, "nth": nth})
+            if marked:
+                self._last_highlight_key = key
         except Exception:
             pass
 
     def _simplify_html_to_text(self, html: str) -> str:
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            for el in soup(["script", "style", "noscript"]):
-                el.decompose()
-            text = soup.get_text(separator="\n")
-            lines = [ln.strip() for ln in text.splitlines()]
-            lines = [ln for ln in lines if ln]
-            return "\n".join(lines)
+            if FastHTMLParser is not None:
+                tree = FastHTMLParser(html)
+                for tag in ("script", "style", "noscript"):
+                    for node in tree.css(tag):
+                        node.decompose()
+                root = tree.body if tree.body is not None else tree.root
+                text = root.text(separator="\n") if root is not None else ""
+            else:
+                soup = BeautifulSoup(html, PARSER, parse_only=BODY_STRAINER)
+                if soup.find("body") is None:
+                    # Fragments without <body> (html.parser doesn't synthesize one)
+                    soup = BeautifulSoup(html, PARSER)
+                for el in soup(["script", "style", "noscript"]):
+                    el.decompose()
+                text = soup.get_text(separator="\n")
+            return self._strip_blank_lines(text)
         except Exception:
             return html
 
+    def _strip_blank_lines(self, text: str) -> str:
+        # One C-level regex pass instead of a per-line Python loop
+        return _BLANK_LINES_RE.sub("\n", text).strip()
+
     async def render(self):
-        html = await self.page.content()
-        if self.render_mode == "text":
-            out = self._simplify_html_to_text(html)
+        # Extract text / serialize HTML and clip it inside the page, so at most
+        # max_chars cross CDP and nothing needs parsing on our side
+        arg = {"mode": self.render_mode, "max": self.max_chars}
+        try:
+            snapshot = await self.page.evaluate(SNAPSHOT_JS, arg)
+        except Exception:
+            # Usually the document was replaced mid-evaluate by a navigation;
+            # let the new one load and try once more
+            await self.wait_loaded(timeout_ms=5000)
+            try:
+                snapshot = await self.page.evaluate(SNAPSHOT_JS, arg)
+            except Exception:
+                snapshot = None
+        if snapshot is not None:
+            source = snapshot["head"]
+            full_len = snapshot["total"]
+        else:
+            source = None
+            if self.render_mode == "text":
+                # Only <body> contributes text; don't ship <head> over CDP
+                try:
+                    source = await self.page.evaluate(
+                        "() => document.body ? document.body.outerHTML : document.documentElement.outerHTML"
+                    )
+                except Exception:
+                    source = None
+            if source is None:
+                try:
+                    source = await self.page.content()
+                except Exception as e:
+                    console.print(Panel.fit(f"Failed to render {self.page.url}: {e}", title="error", border_style="red"))
+                    return
+            full_len = len(source)
+        if snapshot is None and self.render_mode == "text":
+            # Skip re-parsing when the serialized DOM hasn't changed since the last fallback
+            key = hash(source)
+            if self._render_cache is not None and self._render_cache[0] == key:
+                out = self._render_cache[1]
+            else:
+                out = self._simplify_html_to_text(source)
+                self._render_cache = (key, out)
+            total = len(out)
         else:
-            out = html
-        if len(out) > self.max_chars:
-            clipped = out[: self.max_chars]
-            clipped += f"\n\n[... clipped {len(out) - self.max_chars} chars ...]"
-            out = clipped
+            out = source
+            total = full_len
+        head = out[: self.max_chars]
+        if total > len(head):
+            # The in-page slice may keep fewer than max_chars code points
+            out = head + f"\n\n[... clipped {total - len(head)} chars ...]"
         # Add URL header
         header = Text(f"URL: {self.page.url}", style="bold cyan")
         console.print(Panel(header, border_style="cyan"))
-        console.print(out)
+        # Write the body raw: Rich would scan it for markup/highlighting, which is
+        # slow on large pages and mangles HTML that happens to look like [markup]
+        # Encode once with unencodable chars replaced, whatever the body size, so
+        # a non-UTF-8 console never raises UnicodeEncodeError mid-render
+        encoding = sys.stdout.encoding or "utf-8"
+        data = (out + "\n").encode(encoding, "replace")
+        sys.stdout.flush()
+        buffer = getattr(sys.stdout, "buffer", None)
+        if buffer is not None:
+            buffer.write(data)
+            buffer.flush()
+        else:
+            sys.stdout.write(data.decode(encoding))
+            sys.stdout.flush()
 
     def usage(self) -> str:
-        return textwrap.dedent(
-            """
-            Commands:
-              - goto <url>                : navigate to a URL
-              - back                      : go back in history
-              - forward                   : go forward in history
-              - reload                    : reload current page
-              - click <selector> [nth]    : click element by CSS or XPath (prefix with // for XPath). Optional nth index (0-based)
-              - type <selector> <text>    : type text into an input/textarea element
-              - fill <selector> <text>    : fill value directly into an input/textarea
-              - select <selector> <value> : select an option value in a <select>
-              - press <key>               : press a key on the page (e.g., Enter)
-              - press <selector> <key>    : press a key on an element (e.g., input then Enter)
-                             - waitfor <selector> [state|timeout_ms] [timeout_ms]: wait for selector state (attached|detached|visible|hidden) or specify a timeout directly
-              - list <selector> [limit]   : list matching elements with indices and brief info
-              - eval <js>                 : evaluate JavaScript in the page context
-              - view [html|text]          : switch render mode (html default or simplified text)
-              - wait <ms>                 : wait for milliseconds
-              - title                     : print document.title
-              - url                       : print current URL
-              - frames                    : list frames and current selection
-              - useframe <idx|name=|url=>: switch to a frame by index, exact name, or url substring
-              - usemainframe              : switch to main page context
-              - help                      : show this help
-              - exit                      : quit
-
-            Selector notes:
-              - CSS examples: a#login, button.submit, input[name="q"]
-              - XPath examples: //a[contains(., 'Next')], (//button)[1]
-            """
-        ).strip()
+        return USAGE
+
+
+async def read_line() -> str:
+    # Read stdin on a daemon thread. Unlike the default executor, asyncio.run()
+    # doesn't wait for it on shutdown, so Ctrl+C exits without a pending Enter.
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+
+    def _resolve(line):
+        if not fut.done():
+            fut.set_result(line)
+
+    def _reader():
+        try:
+            line = sys.stdin.readline()
+        except Exception:
+            line = ""
+        try:
+            loop.call_soon_threadsafe(_resolve, line)
+        except RuntimeError:
+            # Loop already closed (we were interrupted)
+            pass
+
+    threading.Thread(target=_reader, daemon=True).start()
+    return await fut
 
 
 async def repl(browser: ConsoleBrowser, preloaded_command: Optional[str] = None):
@@ -459,8 +804,9 @@ async def repl(browser: ConsoleBrowser, preloaded_command: Optional[str] = None)
         await action_coro
         await browser.render()
 
-    # Initial render if a page is already open (about:blank otherwise)
-    await browser.render()
+    # Initial render if a page is already open (nothing to show on about:blank)
+    if browser.page.url != "about:blank":
+        await browser.render()
 
     if preloaded_command:
         await handle_command(browser, preloaded_command)
@@ -470,193 +816,310 @@ async def repl(browser: ConsoleBrowser, preloaded_command: Optional[str] = None)
         try:
             prompt = Text(f"browser[{browser.page.url}]> ", style="bold green")
             console.print(prompt, end="")
-            line = sys.stdin.readline()
+            # Read off the event loop so page events keep flowing while we wait
+            line = await read_line()
             if not line:
                 break
             line = line.strip()
             if not line:
                 continue
             await handle_command(browser, line)
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # asyncio.run() delivers Ctrl+C as cancellation of the main task
             console.print("Exiting...")
             break
 
 
-async def handle_command(browser: ConsoleBrowser, line: str):
-    parts = shlex.split(line)
-    if not parts:
-        return
-    cmd = parts[0].lower()
+def split_command(line: str) -> list:
+    # Without quotes or escapes shlex.split is equivalent to str.split
+    if '"' not in line and "'" not in line and "\\" not in line:
+        return line.split()
+    if "\\" not in line:
+        # Simple quoting: tokenize with a regex; fall back to shlex if anything
+        # (e.g. an unbalanced quote) is left between the matched tokens
+        parts = []
+        pos = 0
+        for m in _TOKEN_RE.finditer(line):
+            if line[pos:m.start()].strip():
+                break
+            parts.append(_QUOTED_RE.sub(lambda q: q.group(1) if q.group(1) is not None else q.group(2), m.group()))
+            pos = m.end()
+        else:
+            if not line[pos:].strip():
+                return parts
+    return shlex.split(line)
 
-    if cmd in ("exit", "quit", ":q"):
-        await browser.close()
-        sys.exit(0)
 
-    if cmd in ("help", "h", "?"):
-        console.print(Panel.fit(browser.usage(), title="help", border_style="blue"))
-        return
+def _rest(parts, line, n):
+    # Everything after the first n tokens. Unquoted lines are sliced from the
+    # raw text so runs of spaces survive; quoted ones keep shlex semantics.
+    if '"' in line or "'" in line or "\\" in line:
+        return " ".join(parts[n:])
+    return line.split(None, n)[n]
 
-    if cmd == "view":
-        mode = parts[1] if len(parts) > 1 else None
-        if mode in ("html", "text"):
-            browser.render_mode = mode
-            console.print(Panel.fit(f"Render mode set to {mode}", title="view", border_style="green"))
-        else:
-            console.print(Panel.fit("Usage: view [html|text]", title="view", border_style="yellow"))
-        await browser.render()
-        return
 
-    if cmd == "goto" and len(parts) >= 2:
-        await browser.goto(" ".join(parts[1:]))
-        await browser.render()
-        return
+async def _cmd_exit(browser: ConsoleBrowser, parts, line):
+    await browser.close()
+    sys.exit(0)
 
-    if cmd == "back":
-        await browser.back()
-        await browser.render()
-        return
 
-    if cmd == "forward":
-        await browser.forward()
-        await browser.render()
-        return
+async def _cmd_help(browser: ConsoleBrowser, parts, line):
+    console.print(Panel.fit(USAGE, title="help", border_style="blue"))
 
-    if cmd == "reload":
-        await browser.reload()
-        await browser.render()
-        return
 
-    if cmd == "click" and len(parts) >= 2:
-        nth = None
-        if len(parts) >= 3 and parts[-1].isdigit():
-            # if last token is integer, treat as index
-            nth = int(parts[-1])
-            selector = " ".join(parts[1:-1])
-        else:
-            selector = " ".join(parts[1:])
-        await browser.click(selector, nth=nth)
-        await browser.render()
-        return
+async def _cmd_view(browser: ConsoleBrowser, parts, line):
+    mode = parts[1] if len(parts) > 1 else None
+    if mode in ("html", "text"):
+        changed = mode != browser.render_mode
+        browser.render_mode = mode
+        console.print(Panel.fit(f"Render mode set to {mode}", title="view", border_style="green"))
+        if changed:
+            await browser.render()
+    else:
+        console.print(Panel.fit("Usage: view [html|text]", title="view", border_style="yellow"))
 
-    if cmd == "type" and len(parts) >= 3:
-        selector = parts[1]
-        text = " ".join(parts[2:])
-        await browser.type_into(selector, text)
-        await browser.render()
-        return
 
-    if cmd == "fill" and len(parts) >= 3:
-        selector = parts[1]
-        text = " ".join(parts[2:])
-        await browser.fill(selector, text)
-        await browser.render()
-        return
+async def _cmd_goto(browser: ConsoleBrowser, parts, line):
+    await browser.goto(_rest(parts, line, 1))
+    await browser.render()
 
-    if cmd == "select" and len(parts) >= 3:
-        selector = parts[1]
-        value = " ".join(parts[2:])
-        await browser.select(selector, value)
-        await browser.render()
-        return
 
-    if cmd == "press" and len(parts) >= 2:
-        if len(parts) == 2:
-            # page-level key
-            key = parts[1]
-            await browser.press(key)
-        else:
-            selector = parts[1]
-            key = " ".join(parts[2:])
-            await browser.press(key, selector=selector)
-        await browser.render()
-        return
+async def _cmd_back(browser: ConsoleBrowser, parts, line):
+    await browser.back()
+    await browser.render()
+
+
+async def _cmd_forward(browser: ConsoleBrowser, parts, line):
+    await browser.forward()
+    await browser.render()
+
+
+async def _cmd_reload(browser: ConsoleBrowser, parts, line):
+    await browser.reload()
+    await browser.render()
+
+
+async def _cmd_click(browser: ConsoleBrowser, parts, line):
+    nth = None
+    if len(parts) >= 3 and parts[-1].isdigit():
+        # if last token is integer, treat as index
+        nth = int(parts[-1])
+        selector = " ".join(parts[1:-1])
+    else:
+        selector = " ".join(parts[1:])
+    await browser.click(selector, nth=nth)
+    await browser.render()
+
+
+async def _cmd_type(browser: ConsoleBrowser, parts, line):
+    per_char_delay = None
+    if len(parts) >= 4 and parts[-1] == "--slow":
+        # Real key events for fields that ignore a programmatic fill
+        per_char_delay = 20
+    selector = parts[1]
+    text = _rest(parts, line, 2)
+    if per_char_delay is not None:
+        text = text[: text.rindex("--slow")].rstrip()
+    await browser.type_into(selector, text, per_char_delay=per_char_delay)
+    await browser.render()
+
+
+async def _cmd_fill(browser: ConsoleBrowser, parts, line):
+    selector = parts[1]
+    text = _rest(parts, line, 2)
+    await browser.fill(selector, text)
+    await browser.render()
+
+
+async def _cmd_select(browser: ConsoleBrowser, parts, line):
+    selector = parts[1]
+    value = _rest(parts, line, 2)
+    await browser.select(selector, value)
+    await browser.render()
 
-    if cmd == "waitfor" and len(parts) >= 2:
-        # Support selectors containing spaces by parsing from the end
-        allowed_states = {"attached", "detached", "visible", "hidden"}
-        state = "visible"
-        timeout_ms = 10000
-        tail = []
-        if parts[-1].isdigit():
-            timeout_ms = int(parts[-1])
-            tail.append(parts[-1])
-        if len(parts) - len(tail) > 2 and parts[-1 - len(tail)] in allowed_states:
-            state = parts[-1 - len(tail)]
-            tail.append(parts[-1 - len(tail)])
-        # selector is everything between cmd and tail
-        sel_end = len(parts) - len(tail)
-        selector = " ".join(parts[1:sel_end])
-        await browser.waitfor(selector, state=state, timeout_ms=timeout_ms)
-        await browser.render()
-        return
 
-    if cmd == "list" and len(parts) >= 2:
+async def _cmd_press(browser: ConsoleBrowser, parts, line):
+    if len(parts) == 2:
+        # page-level key
+        key = parts[1]
+        await browser.press(key)
+    else:
         selector = parts[1]
-        limit = int(parts[2]) if len(parts) >= 3 and parts[2].isdigit() else 20
-        await browser.list_elements(selector, limit=limit)
-        await browser.render()
-        return
+        key = _rest(parts, line, 2)
+        await browser.press(key, selector=selector)
+    await browser.render()
 
-    if cmd == "eval" and len(parts) >= 2:
-        js = line[len("eval "):]
-        await browser.eval_js(js)
-        await browser.render()
-        return
 
-    if cmd == "wait" and len(parts) >= 2:
-        try:
-            ms = int(parts[1])
-            await asyncio.sleep(ms / 1000.0)
-        except ValueError:
-            console.print(Panel.fit("Usage: wait <ms>", title="wait", border_style="yellow"))
-        await browser.render()
-        return
+async def _cmd_waitfor(browser: ConsoleBrowser, parts, line):
+    # Support selectors containing spaces by parsing from the end
+    allowed_states = {"attached", "detached", "visible", "hidden"}
+    state = "visible"
+    timeout_ms = 10000
+    tail = []
+    if parts[-1].isdigit():
+        timeout_ms = int(parts[-1])
+        tail.append(parts[-1])
+    if len(parts) - len(tail) > 2 and parts[-1 - len(tail)] in allowed_states:
+        state = parts[-1 - len(tail)]
+        tail.append(parts[-1 - len(tail)])
+    # selector is everything between cmd and tail
+    sel_end = len(parts) - len(tail)
+    selector = " ".join(parts[1:sel_end])
+    await browser.waitfor(selector, state=state, timeout_ms=timeout_ms)
+    await browser.render()
 
-    if cmd == "title":
-        try:
-            title = await browser.page.title()
-            console.print(Panel.fit(title, title="title", border_style="blue"))
-        except Exception as e:
-            console.print(Panel.fit(f"Failed to get title: {e}", title="error", border_style="red"))
-        await browser.render()
-        return
 
-    if cmd == "url":
-        console.print(Panel.fit(browser.page.url, title="url", border_style="blue"))
-        await browser.render()
-        return
+async def _cmd_list(browser: ConsoleBrowser, parts, line):
+    selector = parts[1]
+    limit = int(parts[2]) if len(parts) >= 3 and parts[2].isdigit() else 20
+    await browser.list_elements(selector, limit=limit)
+    await browser.render()
 
-    if cmd == "frames":
-        await browser.list_frames()
-        await browser.render()
-        return
 
-    if cmd == "useframe" and len(parts) >= 2:
-        token = " ".join(parts[1:])
-        await browser.use_frame(token)
-        await browser.render()
+async def _cmd_eval(browser: ConsoleBrowser, parts, line):
+    js = line[len("eval "):]
+    await browser.eval_js(js)
+    await browser.render()
+
+
+async def _cmd_wait(browser: ConsoleBrowser, parts, line):
+    try:
+        ms = int(parts[1])
+        await asyncio.sleep(ms / 1000.0)
+    except ValueError:
+        console.print(Panel.fit("Usage: wait <ms>", title="wait", border_style="yellow"))
+
+
+async def _cmd_title(browser: ConsoleBrowser, parts, line):
+    try:
+        title = await browser.page.title()
+        console.print(Panel.fit(title, title="title", border_style="blue"))
+    except Exception as e:
+        console.print(Panel.fit(f"Failed to get title: {e}", title="error", border_style="red"))
+
+
+async def _cmd_url(browser: ConsoleBrowser, parts, line):
+    console.print(Panel.fit(browser.page.url, title="url", border_style="blue"))
+
+
+async def _cmd_frames(browser: ConsoleBrowser, parts, line):
+    await browser.list_frames()
+
+
+async def _cmd_useframe(browser: ConsoleBrowser, parts, line):
+    token = _rest(parts, line, 1)
+    await browser.use_frame(token)
+
+
+async def _cmd_usemainframe(browser: ConsoleBrowser, parts, line):
+    await browser.use_main_frame()
+
+
+# command -> (minimum number of tokens including the command, handler)
+COMMANDS = {
+    "exit": (1, _cmd_exit),
+    "quit": (1, _cmd_exit),
+    ":q": (1, _cmd_exit),
+    "help": (1, _cmd_help),
+    "h": (1, _cmd_help),
+    "?": (1, _cmd_help),
+    "view": (1, _cmd_view),
+    "goto": (2, _cmd_goto),
+    "back": (1, _cmd_back),
+    "forward": (1, _cmd_forward),
+    "reload": (1, _cmd_reload),
+    "click": (2, _cmd_click),
+    "type": (3, _cmd_type),
+    "fill": (3, _cmd_fill),
+    "select": (3, _cmd_select),
+    "press": (2, _cmd_press),
+    "waitfor": (2, _cmd_waitfor),
+    "list": (2, _cmd_list),
+    "eval": (2, _cmd_eval),
+    "wait": (2, _cmd_wait),
+    "title": (1, _cmd_title),
+    "url": (1, _cmd_url),
+    "frames": (1, _cmd_frames),
+    "useframe": (2, _cmd_useframe),
+    "usemainframe": (1, _cmd_usemainframe),
+}
+
+
+async def handle_command(browser: ConsoleBrowser, line: str):
+    # --once passes the line through unstripped; _rest slices the raw text
+    line = line.strip()
+    parts = split_command(line)
+    if not parts:
         return
+    cmd = parts[0].lower()
 
-    if cmd == "usemainframe":
-        await browser.use_main_frame()
-        await browser.render()
+    entry = COMMANDS.get(cmd)
+    if entry is not None and len(parts) >= entry[0]:
+        await entry[1](browser, parts, line)
         return
 
-    console.print(Panel.fit(f"Unknown or malformed command: {line}\n\n{browser.usage()}", title="error", border_style="red"))
+    console.print(Panel.fit(f"Unknown or malformed command: {line}\n\n{USAGE}", title="error", border_style="red"))
+
+
+def playwright_browsers_dir() -> str:
+    # Mirrors Playwright's default download location per platform
+    env = os.environ.get("PLAYWRIGHT_BROWSERS_PATH")
+    if env == "0":
+        # Browsers were installed inside the playwright package itself
+        import playwright
+        return os.path.join(os.path.dirname(playwright.__file__), "driver", "package", ".local-browsers")
+    if env:
+        return env
+    if sys.platform.startswith("win"):
+        return os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "ms-playwright")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches/ms-playwright")
+    return os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "ms-playwright")
 
 
-async def ensure_playwright_browsers():
-    # Ensure Chromium is installed by attempting a lightweight launch; if it fails, install browsers.
+def browser_revisions() -> Optional[dict]:
+    # Builds this playwright release expects (name -> revision), from the driver's browsers.json
     try:
-        async with async_playwright() as pw:
-            try:
-                browser = await pw.chromium.launch(headless=True)
-                await browser.close()
-                return
-            except Exception:
-                pass
+        import playwright
+        path = os.path.join(os.path.dirname(playwright.__file__), "driver", "package", "browsers.json")
+        with open(path, encoding="utf-8") as f:
+            browsers = json.load(f)["browsers"]
     except Exception:
-        pass
+        return None
+    revisions = {}
+    for entry in browsers:
+        if entry.get("revisionOverrides"):
+            # Per-platform revisions; not worth resolving here
+            revisions[entry.get("name")] = None
+        else:
+            revisions[entry.get("name")] = entry.get("revision")
+    return revisions
+
+
+def chromium_installed(headless: bool = True) -> bool:
+    # Only the exact revision start() will launch counts. Since playwright 1.49
+    # headless runs use the separate chromium-headless-shell build, so check
+    # that one when running headless and full Chromium otherwise
+    revisions = browser_revisions()
+    if not revisions:
+        return False
+    if headless and "chromium-headless-shell" in revisions:
+        revision = revisions["chromium-headless-shell"]
+        directory = "chromium_headless_shell-{}"
+    else:
+        revision = revisions.get("chromium")
+        directory = "chromium-{}"
+    if not revision:
+        return False
+    marker = os.path.join(playwright_browsers_dir(), directory.format(revision), "INSTALLATION_COMPLETE")
+    return os.path.exists(marker)
+
+
+async def ensure_playwright_browsers(headless: bool = True):
+    # Filesystem check only; launching Chromium just to probe costs a cold start.
+    # When unsure we run the installer, which is a no-op if the build is present.
+    if chromium_installed(headless):
+        return
 
     console.print(Panel.fit("Installing Playwright browsers (chromium)...", title="setup", border_style="blue"))
     import subprocess
@@ -672,25 +1135,41 @@ def parse_args():
     parser.add_argument("--headed", action="store_true", help="Run with UI (if available)")
     parser.add_argument("--render", choices=["html", "text"], default="html", help="Render mode")
     parser.add_argument("--max-chars", type=int, default=200000, help="Max characters to print per render")
+    parser.add_argument("--keystroke", action="store_true", help="Type with per-character key events instead of filling the value")
+    parser.add_argument("--no-images", action="store_true", help="Do not load images or media")
+    parser.add_argument("--allow-resources", type=str, default="", help="Comma-separated resource types to load anyway (image,media,font; all blocked by default)")
+    parser.add_argument("--quiet-ms", type=int, default=300, help="Network quiet window (ms) after which a page counts as settled")
     parser.add_argument("--user-data-dir", type=str, default=None, help="Persistent user data directory")
     parser.add_argument("--once", type=str, default=None, help="Run a single command and exit (e.g., \"goto https://example.com\")")
     parser.add_argument("--url", type=str, default=None, help="Initial URL to open")
-    return parser.parse_args()
+    args = parser.parse_args()
+    allowed = {r.strip() for r in args.allow_resources.split(",") if r.strip()}
+    unknown = sorted(allowed - set(BLOCKABLE_RESOURCES))
+    if unknown:
+        parser.error(f"--allow-resources: unknown resource type(s) {', '.join(unknown)} (choose from {', '.join(BLOCKABLE_RESOURCES)})")
+    if args.no_images and allowed & {"image", "media"}:
+        parser.error("--no-images cannot be combined with --allow-resources image/media")
+    return args
 
 
 async def main():
     args = parse_args()
-    await ensure_playwright_browsers()
 
     headless = True
     if args.headed:
         headless = False
 
+    await ensure_playwright_browsers(headless)
+
     browser = ConsoleBrowser(
         user_data_dir=args.user_data_dir,
         headless=headless,
         render_mode=args.render,
         max_chars=args.max_chars,
+        keystroke=args.keystroke,
+        no_images=args.no_images,
+        allow_resources=[r.strip() for r in args.allow_resources.split(",") if r.strip()],
+        quiet_ms=args.quiet_ms,
     )
 
     await browser.start()
@@ -705,8 +1184,24 @@ async def main():
         await browser.close()
 
 
-if __name__ == "__main__":
+def run_main():
+    # uvloop is optional; stock asyncio is used when it isn't installed (e.g. Windows)
     try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+    if uvloop is None:
         asyncio.run(main())
+    elif sys.version_info >= (3, 12):
+        # loop_factory avoids the event-loop policy API that uvloop.install() uses
+        asyncio.run(main(), loop_factory=uvloop.new_event_loop)
+    else:
+        uvloop.install()
+        asyncio.run(main())
+
+
+if __name__ == "__main__":
+    try:
+        run_main()
     except KeyboardInterrupt:
         pass
\ No newline at end of file